@@ -6,37 +6,49 @@ This script processes climate zones, zip codes, and CALMAC load shape data
 to create a merged dataset for feeder congestion analysis.
 """
 
+import numpy as np
 import pandas as pd
 import geopandas as gpd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from shapely import STRtree, centroid
 from shapely.geometry import Point
 # Import load data processing functions from the load_data_loader module
-# These functions handle loading and merging of CALMAC hourly load shape data
-from load_data_loader import load_calmac_load_shapes, merge_load_data
+# These functions handle loading of CALMAC hourly load shape data
+from load_data_loader import SUMMER_MONTHS, load_month_hour_means
+
+# Mapping climate zones to CALMAC territories, from CALMAC data description
+CZ_GROUPS = {
+    1: "Coastal", 3: "Coastal", 5: "Coastal",
+    2: "Inland", 4: "Inland",
+    11: "North Central Valley", 12: "North Central Valley",
+    13: "South Central Valley"
+}
+# Shared dtype for cz_groups and seg_cz so merges compare category codes
+CZ_DTYPE = pd.CategoricalDtype(sorted(set(CZ_GROUPS.values())))
+
+# California Albers (equal-area, meters), already the CRS of the CEC climate zones
+PROJECTED_CRS = "EPSG:3310"
+
+ZIPS_CLIMATE_PATH = "zip_codes/zips_climate.parquet"
+ZIPS_WITH_LOADS_PATH = "zip_codes/zips_with_loads.parquet"
 
 def load_climate_zones():
     """Load shapefile of CEC climate zones"""
     print("Loading climate zones...")
-    climate_zones = gpd.read_file("CALMAC/Building_Climate_Zones.shp")
+    climate_zones = gpd.read_file("CALMAC/Building_Climate_Zones.shp", engine="pyogrio", columns=["BZone"])
     return climate_zones
 
 def load_zip_codes():
     """Load zip code shapefile"""
     print("Loading zip codes...")
-    zips = gpd.read_file("zip_codes/zip_poly.shp")
+    zips = gpd.read_file("zip_codes/zip_poly.shp", engine="pyogrio", columns=["ZIP_CODE", "POPULATION"])
     return zips
 
 def map_climate_zones(climate_zones):
     """Map climate zones to CALMAC territories"""
-    # Mapping climate zones to CALMAC territories, from CALMAC data description
-    cz_groups = {
-        1: "Coastal", 3: "Coastal", 5: "Coastal",
-        2: "Inland", 4: "Inland",
-        11: "North Central Valley", 12: "North Central Valley",
-        13: "South Central Valley"
-    }
-    
     climate_zones["BZone"] = climate_zones["BZone"].astype(int)
-    climate_zones["cz_groups"] = climate_zones["BZone"].map(cz_groups)  # BZone is the CEC column with numeric climate zones
+    climate_zones["cz_groups"] = climate_zones["BZone"].map(CZ_GROUPS).astype(CZ_DTYPE)  # BZone is the CEC column with numeric climate zones
     
     return climate_zones
 
@@ -44,18 +56,35 @@ def process_zip_climate_mapping(zips, climate_zones):
     """Process zip code to climate zone mapping"""
     print("Processing zip code to climate zone mapping...")
     
-    # Ensure coordinate systems match
-    zips = zips.to_crs(climate_zones.crs)
+    # Project both layers to California Albers so centroids and the join are planar
+    zips = zips.to_crs(PROJECTED_CRS)
+    climate_zones = climate_zones.to_crs(PROJECTED_CRS)
+    
+    # Find zip centroids (one vectorized call over the geometry array) to ensure only one climate zone per ZIP
+    zip_centroids = centroid(zips.geometry.to_numpy())
+    
+    # Keep only climate zones that overlap the overall bounding box of the zips
+    minx, miny, maxx, maxy = zips.total_bounds
+    climate_zones = climate_zones.cx[minx:maxx, miny:maxy]
     
-    # Find zip centroids to ensure only one climate zone per ZIP
-    zips["centroid"] = zips.centroid
-    zips_centroids = zips.set_geometry("centroid")
+    # Index the zip centroids and query them with the climate zone polygons; STRtree
+    # prepares the query geometries, so the polygons get prepared containment tests
+    zone_geoms = climate_zones.geometry.to_numpy()
+    right, left = STRtree(zip_centroids).query(zone_geoms, predicate="contains")
+    # Back to zip order, as the rows are taken from zips below
+    order = np.argsort(left, kind="stable")
+    left, right = left[order], right[order]
     
-    # Spatial join to find climate zones for each zip centroid
-    zips_climate = gpd.sjoin(zips_centroids, climate_zones, how="left", predicate="within")
+    # Zips whose centroid falls in no climate zone get no row
+    zone_attrs = climate_zones.iloc[right][["BZone", "cz_groups"]].reset_index(drop=True)
+    zips_climate = zips.iloc[left].reset_index(drop=True).assign(**zone_attrs)
     
-    # Filter out zips without climate zone assignments
-    zips_climate = zips_climate[zips_climate["cz_groups"].notna()].copy()
+    # Filter out zips without climate zone assignments and keep only the columns used downstream
+    zips_climate = zips_climate[zips_climate["cz_groups"].notna()]
+    zips_climate = zips_climate[["ZIP_CODE", "POPULATION", "geometry", "cz_groups"]].reset_index(drop=True)
+    
+    # Integer surrogate key; this is the ZIP dimension the load rows point at
+    zips_climate.insert(0, "zip_id", np.arange(len(zips_climate), dtype=np.int32))
     
     return zips_climate
 
@@ -63,9 +92,10 @@ def load_calmac_characteristics():
     """Load CALMAC residential and non-residential characteristics"""
     print("Loading CALMAC characteristics...")
     
-    # Load CALMAC characteristics 
-    res_chars = pd.read_csv("CALMAC/res_characteristics.csv")
-    nonres_chars = pd.read_csv("CALMAC/nonres_characteristics.csv")
+    # Load CALMAC characteristics (only gp and seg_cz are used downstream)
+    read_opts = dict(engine="pyarrow", usecols=["gp", "seg_cz"], dtype={"gp": str, "seg_cz": CZ_DTYPE})
+    res_chars = pd.read_csv("CALMAC/res_characteristics.csv", **read_opts)
+    nonres_chars = pd.read_csv("CALMAC/nonres_characteristics.csv", **read_opts)
     
     # Combine res and nonres GPs, create 'type' column
     res_chars["type"] = "residential"
@@ -73,81 +103,91 @@ def load_calmac_characteristics():
     
     gps_all = pd.concat([res_chars, nonres_chars], ignore_index=True)
     
+    # Categorical keys for the zone merge and the load data join (seg_cz is read as CZ_DTYPE)
+    gps_all["gp"] = gps_all["gp"].astype("category")
+    
     return gps_all
 
 def group_by_climate_zone(gps_all):
-    """Group GPs by CALMAC climate zone"""
+    """Group GPs by CALMAC climate zone, one row per (seg_cz, gp)"""
     print("Grouping GPs by climate zone...")
     
-    # Group by CALMAC climate zone 
-    gps_by_zone = gps_all.groupby("seg_cz")["gp"].apply(list).reset_index()
-    gps_by_zone.rename(columns={"gp": "gp_list"}, inplace=True)
+    # Long form instead of a gp list per zone, so the merge needs no explode
+    gps_by_zone = gps_all[["seg_cz", "gp"]].drop_duplicates().reset_index(drop=True)
     
     return gps_by_zone
 
 def merge_datasets(zips_climate, gps_by_zone):
-    """Merge zip codes with climate zone data"""
+    """Merge zip codes with climate zone data, one row per ZIP-gp keyed by zip_id (no ZIP attributes)"""
     print("Merging datasets...")
     
-    zips_final = zips_climate.merge(
-        gps_by_zone, left_on="cz_groups", right_on="seg_cz", how="left"
+    zips_final = zips_climate[["zip_id", "cz_groups"]].merge(
+        gps_by_zone, left_on="cz_groups", right_on="seg_cz", how="left", sort=False
     )
     
-    # Drop unnecessary columns
-    zips_final = zips_final.drop(columns=["PO_NAME", "STATE", "index_right", "BAcerage"])
-    
     return zips_final
 
-def expand_load_shapes(zips_final):
-    """Expand the dataset to have one row per load shape"""
-    print("Expanding load shapes...")
-    
-    zips_expanded = zips_final.explode("gp_list").reset_index(drop=True)
-    zips_expanded.rename(columns={"gp_list": "gp"}, inplace=True)
-    
-    return zips_expanded
-
-def load_and_merge_load_data(zips_expanded):
-    """Load CALMAC load data, aggregate to month-hour per gp, filter to may-october and merge with expanded ZIP data
-    Result: one row per ZIP-gp-month-hour"""
+def aggregate_load_data():
+    """Load CALMAC load data (may-october) and aggregate to mean kwh per gp-month-hour"""
     print("Loading CALMAC load shape data...")
     
-    # Load the actual hourly load shape data from CALMAC CSV file
-    # This contains gp, date, hour, kwh columns for all load profiles
-    load_data = load_calmac_load_shapes()
-
-    # ensure date is datetime
-    load_data["date"] = pd.to_datetime(load_data["date"])
-
-    # Filter to may-october
-    load_data = load_data[(load_data["date"].dt.month >= 5) & (load_data["date"].dt.month <= 10)].copy()
-    load_data["month"] = load_data["date"].dt.month
-    load_data = (
-        load_data.groupby(["gp", "month", "hour"], as_index=False).agg({"kwh": "mean"})
-    )
+    # Same gp-month-hour mean the feeder pipeline uses, computed by the loader
+    # from the Parquet cache (already filtered to may-october)
+    load_data = load_month_hour_means()
     print(f"Aggregated rows: {len(load_data)}")
 
-    # Merge the load data with expanded ZIP data using gp as the key
-    # This creates the final dataset with hourly consumption for each ZIP
-    zips_with_loads = zips_expanded.merge(load_data, on="gp",how="left")
-    print(f"Final ZIP-gp-month-hour rows: {len(zips_with_loads)}")
-    
-    return zips_with_loads
-
-#def save_results(zips_final, zips_expanded, zips_with_loads=None):
-   # """Save processed datasets"""
-   # print("Saving results...")
-    
-    # Save the base datasets
-    #zips_final.to_csv("zip_codes/zips_final.csv", index=False)
-    #zips_expanded.to_csv("zip_codes/zips_expanded.csv", index=False)
-    
-    # Save the load data if it was merged (optional parameter)
-    #if zips_with_loads is not None:
-       # zips_with_loads.to_csv("zip_codes/zips_with_loads.csv", index=False)
-       # print("Load data merged and saved!")  # Confirmation that load data processing completed
+    return load_data
+
+def iter_zips_with_loads(zips_final, load_data):
+    """Merge the aggregated load data with ZIP-gp data one month at a time
+    Yields: narrow zip_id, gp, month, hour, kwh rows for each month"""
+    # Give both sides identical gp categories so the merge joins on the integer codes
+    gp_dtype = pd.CategoricalDtype(sorted(
+        set(zips_final["gp"].cat.categories) | set(load_data["gp"].cat.categories)
+    ))
+    zip_gp = zips_final[["zip_id", "gp"]].astype({"gp": gp_dtype})
+    load_data = load_data.astype({"gp": gp_dtype})
+    
+    first_month, last_month = SUMMER_MONTHS
+    for month in range(first_month, last_month + 1):
+        month_loads = load_data[load_data["month"] == month]
+        # Merge the load data with ZIP-gp data using gp as the key
+        yield zip_gp.merge(month_loads, on="gp", how="inner", sort=False)
+
+def get_with_attrs(zips_with_loads, zip_dim, columns=("ZIP_CODE", "POPULATION", "cz_groups")):
+    """Join ZIP attributes from the ZIP dimension onto zip_id-keyed load rows, for display/export"""
+    return zips_with_loads.merge(zip_dim[["zip_id", *columns]], on="zip_id", how="left")
+
+def save_results(zips_climate, zips_final, load_data):
+    """Save processed datasets
+    The ZIP dimension (attributes + polygons) goes to GeoParquet once per ZIP;
+    zips_with_loads is written to Parquet one month at a time
+    Returns the first rows written, for previewing without re-reading the file"""
+    print("Saving results...")
+    
+    # Save the ZIP dimension once per ZIP rather than once per ZIP-gp
+    zips_climate.to_parquet(ZIPS_CLIMATE_PATH, index=False)
+    
+    # Stream the ZIP-gp-month-hour merge into a single Parquet file
+    writer = None
+    n_rows = 0
+    preview = None
+    try:
+        for part in iter_zips_with_loads(zips_final, load_data):
+            table = pa.Table.from_pandas(part, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(ZIPS_WITH_LOADS_PATH, table.schema, compression="zstd")
+                preview = part.head()
+            writer.write_table(table)
+            n_rows += len(part)
+    finally:
+        if writer is not None:
+            writer.close()
+    print(f"Final ZIP-gp-month-hour rows: {n_rows}")
     
     print("Files saved successfully!")
+    
+    return preview
 
 def main():
     """Main data wrangling pipeline"""
@@ -167,25 +207,21 @@ def main():
     gps_all = load_calmac_characteristics()
     gps_by_zone = group_by_climate_zone(gps_all)
     
-    # Merge datasets
+    # Merge datasets (one row per ZIP-gp)
     zips_final = merge_datasets(zips_climate, gps_by_zone)
     
-    # Expand load shapes
-    zips_expanded = expand_load_shapes(zips_final)
-    
-    # LOAD DATA INTEGRATION - Load and merge hourly CALMAC load shape data
-    # This step creates the final zips_with_loads dataset with hourly consumptio
-    zips_with_loads = load_and_merge_load_data(zips_expanded)
+    # LOAD DATA INTEGRATION - Load and aggregate hourly CALMAC load shape data
+    load_data = aggregate_load_data()
     
-    # Save all processed datasets including the merged load data
-    save_results(zips_final, zips_expanded, zips_with_loads)
+    # Save all processed datasets; this merges the load data month by month
+    # into the final zips_with_loads dataset with hourly consumption
+    zips_with_loads_preview = save_results(zips_climate, zips_final, load_data)
     
     # Print summary information
     print("\n=== Data Summary ===")
     print(f"Climate zones: {len(climate_zones)}")
     print(f"Zip codes processed: {len(zips_climate)}")
-    print(f"Final merged records: {len(zips_final)}")
-    print(f"Expanded records (one per load shape): {len(zips_expanded)}")
+    print(f"Final merged records (one per ZIP-gp): {len(zips_final)}")
     
     # Print unique values for verification
     print("\n=== Climate Zone Groups ===")
@@ -194,13 +230,13 @@ def main():
     print("Unique BZone in climate_zones:", climate_zones["BZone"].unique())
     print("Unique cz_groups in climate_zones:", climate_zones["cz_groups"].unique())
     
+    # Preview from the rows already in memory rather than re-reading the output
+    print("\nPreview of zips_with_loads.parquet:")
+    print(get_with_attrs(zips_with_loads_preview, zips_climate))
+    
     print("\nData wrangling completed successfully!")
     
-    return zips_final, zips_expanded
+    return zips_final
 
 if __name__ == "__main__":
-    zips_final, zips_expanded = main()
-    import pandas as pd
-    df = pd.read_csv("zip_codes/zips_with_loads.csv")
-    print("\nPreview of zips_with_loads.csv:")
-    print(df.head())
+    zips_final = main()
@@ -0,0 +1,116 @@
+"""
+CALMAC load shape loader for Predicted Feeder Congestion
+
+Reads the hourly residential load shapes (gp, date, hour, kwh). The CSV is
+parsed once with pyarrow's multithreaded reader, filtered to May–October, and
+written to a Parquet sibling; both pipelines then aggregate that file to mean
+kWh per gp, month and hour with load_month_hour_means.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pac
+import pyarrow.parquet as pq
+
+LOAD_SHAPES_CSV = "CALMAC/Res_GP_Elec_2024.csv"
+LOAD_SHAPES_PARQUET = "CALMAC/Res_GP_Elec_2024_may_oct.parquet"
+LOAD_COLUMNS = ["gp", "date", "hour", "kwh"]
+
+# Fixed schema so every CSV chunk is written with the same dictionary/int widths
+LOAD_SCHEMA = pa.schema([
+    ("gp", pa.dictionary(pa.int32(), pa.string())),
+    ("date", pa.dictionary(pa.int32(), pa.string())),
+    ("hour", pa.int8()),
+    ("kwh", pa.float32()),
+    ("month", pa.int8()),
+])
+
+# May–October
+SUMMER_MONTHS = (5, 10)
+
+
+def read_load_shapes_csv(csv_path: str = LOAD_SHAPES_CSV) -> pa.Table:
+    """
+    Parse the load shape CSV into an Arrow table using all cores.
+
+    Columns are typed at parse time (gp and the ISO date text dictionary-encoded,
+    hour int8, kwh float32); dates are not parsed into datetimes.
+    """
+    return pac.read_csv(
+        csv_path,
+        read_options=pac.ReadOptions(use_threads=True, block_size=64 << 20),
+        convert_options=pac.ConvertOptions(
+            include_columns=LOAD_COLUMNS,
+            column_types={name: LOAD_SCHEMA.field(name).type for name in LOAD_COLUMNS},
+        ),
+    )
+
+
+def iter_may_oct_chunks(csv_path: str = LOAD_SHAPES_CSV, chunksize: int = 1_000_000):
+    """
+    Yield the load shapes in chunks of at most `chunksize` rows, keeping only
+    May–October rows, with an int8 'month' column already derived.
+    """
+    first, last = SUMMER_MONTHS
+    for batch in read_load_shapes_csv(csv_path).to_batches(max_chunksize=chunksize):
+        chunk = batch.to_pandas()
+        # Month from the ISO 'YYYY-MM-DD' text, sliced once per distinct date
+        dates = chunk["date"].cat
+        month_of_date = dates.categories.str.slice(5, 7).astype(np.int8).to_numpy()
+        m = month_of_date[dates.codes.to_numpy()]
+        mask = (m >= first) & (m <= last)
+        yield chunk.loc[mask, LOAD_COLUMNS].assign(month=m[mask].astype(np.int8))
+
+
+def ensure_parquet_cache(csv_path: str = LOAD_SHAPES_CSV, parquet_path: str = LOAD_SHAPES_PARQUET) -> str:
+    """
+    Write a May–October Parquet copy of the load shape CSV if it is missing,
+    older than the CSV, or was written with a different LOAD_SCHEMA.
+
+    The full year is only held as a compact Arrow table while converting.
+    """
+    if (
+        os.path.exists(parquet_path)
+        and os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path)
+        and pq.read_schema(parquet_path).equals(LOAD_SCHEMA, check_metadata=False)
+    ):
+        return parquet_path
+
+    print(f"Converting {csv_path} to Parquet...")
+    tmp_path = parquet_path + ".tmp"
+    with pq.ParquetWriter(tmp_path, LOAD_SCHEMA, compression="zstd") as writer:
+        for chunk in iter_may_oct_chunks(csv_path):
+            table = pa.Table.from_pandas(chunk, schema=LOAD_SCHEMA, preserve_index=False)
+            writer.write_table(table)
+    os.replace(tmp_path, parquet_path)
+    return parquet_path
+
+
+def load_month_hour_means(gps=None) -> pd.DataFrame:
+    """
+    Mean May–October kWh per gp, month and hour.
+
+    The group-by runs multi-threaded in Arrow on the cached Parquet table, so
+    the hourly rows are never materialized as a pandas frame. If `gps` is
+    given, only those GPs are read and aggregated.
+    """
+    parquet_path = ensure_parquet_cache()
+    print(f"Aggregating residential electric load shapes from {parquet_path}...")
+    # Typed value set, so an empty selection filters everything out instead of
+    # failing Arrow's string-vs-null type check
+    filters = None if gps is None else [("gp", "in", pa.array([str(gp) for gp in gps], type=pa.string()))]
+    table = pq.read_table(parquet_path, columns=["gp", "month", "hour", "kwh"], filters=filters)
+    means = table.group_by(["gp", "month", "hour"]).aggregate([("kwh", "mean")])
+    load_month_hour = (
+        means.rename_columns(["gp", "month", "hour", "kwh"])
+        .to_pandas()
+        .sort_values(["gp", "month", "hour"], ignore_index=True)
+    )
+    load_month_hour["kwh"] = load_month_hour["kwh"].astype("float32")
+    # Keep string categories even when the filter leaves no rows (else object)
+    gp_categories = load_month_hour["gp"].cat.categories.astype(str)
+    load_month_hour["gp"] = load_month_hour["gp"].cat.set_categories(gp_categories)
+    return load_month_hour
@@ -5,34 +5,92 @@
 - ICA / feeder metadata (line rating, %res, %ind, %com, congestion Y/N)
 """
 
+import argparse
+import functools
+import gc
+import hashlib
+import inspect
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pandas as pd
 import geopandas as gpd
+import pyarrow.parquet as pq
+import shapely
 from shapely.geometry import Point
-def load_calmac_load_shapes():
+from load_data_loader import ensure_parquet_cache, load_month_hour_means
+
+CACHE_DIR = "cache"
+
+# California Albers (equal-area, meters), the CRS of the CEC climate zones. Every
+# layer is projected to it once in main(); the spatial steps assume it.
+PROJECTED_CRS = "EPSG:3310"
+
+
+# 0. Loader cache
+def disk_cache(*paths):
     """
-    Load CALMAC hourly load shapes.
+    Cache a loader's result as Parquet in cache/<loader>_<key>.parquet.
 
-    Expects a CSV with at least: gp, date, hour, kwh
+    The key hashes each input path with its mtime and size plus the loader's
+    source text, so editing an input (including shapefile sidecars such as
+    .prj) or the loader (e.g. its column list) invalidates the cache.
+    GeoDataFrames round-trip via GeoParquet. Call the loader with force=True
+    to ignore and rewrite the cache.
     """
-    print("Loading residential electric load shapes from CALMAC/Res_GP_Elec_2024.csv...")
-    load_data = pd.read_csv("CALMAC/Res_GP_Elec_2024.csv")
-    return load_data
+    def decorator(fn):
+        # Source text rather than code objects, whose reprs embed per-process addresses
+        source = inspect.getsource(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, force: bool = False, **kwargs):
+            stats = [(p, os.stat(p).st_mtime_ns, os.stat(p).st_size) for p in paths]
+            key = hashlib.blake2b(
+                str((stats, source)).encode(), digest_size=16
+            ).hexdigest()
+            cache_path = os.path.join(CACHE_DIR, f"{fn.__name__}_{key}.parquet")
+
+            if not force and os.path.exists(cache_path):
+                print(f"Loading cached {fn.__name__} from {cache_path}...")
+                if b"geo" in (pq.read_schema(cache_path).metadata or {}):
+                    return gpd.read_parquet(cache_path)
+                return pd.read_parquet(cache_path)
+
+            result = fn(*args, **kwargs)
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            # Write then rename, so an interrupted run never leaves a truncated cache hit
+            tmp_path = cache_path + ".tmp"
+            result.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, cache_path)
+            return result
+        return wrapper
+    return decorator
+
+
+def shapefile_parts(stem: str) -> list:
+    """Paths of a shapefile's component files; the optional .prj/.cpg only if present."""
+    parts = [f"{stem}.{ext}" for ext in ("shp", "shx", "dbf")]
+    return parts + [p for p in (f"{stem}.prj", f"{stem}.cpg") if os.path.exists(p)]
 
 
 #1. Load spatial data
+@disk_cache(*shapefile_parts("CALMAC/Building_Climate_Zones"))
 def load_climate_zones():
     """Load CEC building climate zones shapefile."""
     print("Loading climate zones...")
-    climate_zones = gpd.read_file("CALMAC/Building_Climate_Zones.shp")
+    climate_zones = gpd.read_file("CALMAC/Building_Climate_Zones.shp", engine="pyogrio", columns=["BZone"])
     return climate_zones
 
+@disk_cache(*shapefile_parts("zip_codes/zip_poly"))
 def load_zip_polygons():
     """Load ZIP code polygons shapefile."""
     print("Loading ZIP polygons...")
-    zips = gpd.read_file("zip_codes/zip_poly.shp")
+    zips = gpd.read_file("zip_codes/zip_poly.shp", engine="pyogrio", columns=["ZIP_CODE"])
     return zips
 
     
+@disk_cache(*shapefile_parts("ica_data/FeederDetail_Voltage"))
 def load_feeders():
     """
     Load feeder shapefile.
@@ -43,7 +101,7 @@ def load_feeders():
       - a unique feeder ID column, e.g. 'feeder_id'
     """
     print("Loading feeders...")
-    feeders = gpd.read_file("ica_data/FeederDetail_Voltage.shp")  
+    feeders = gpd.read_file("ica_data/FeederDetail_Voltage.shp", engine="pyogrio", columns=["feederid"])
     return feeders
 
 # Map ZIP -> climate zone --> GP list
@@ -66,25 +124,25 @@ def map_climate_zones(climate_zones: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
     return climate_zones
 
 
-def process_zip_climate_mapping(zips: gpd.GeoDataFrame, climate_zones: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+def process_zip_climate_mapping(zips: gpd.GeoDataFrame, climate_zones: gpd.GeoDataFrame) -> pd.DataFrame:
     """
     Assign each ZIP a climate zone group based on centroid location.
-    Returns a GeoDataFrame with ZIP geometry and cz_groups.
+    Both layers must already be in PROJECTED_CRS.
+    Returns a plain DataFrame with ZIP_CODE and cz_groups (no geometry).
     """
     print("Processing ZIP → climate group mapping...")
-    zips = zips.to_crs(climate_zones.crs)
-    zips_centroids = zips.copy()
-    zips_centroids["geometry"] = zips_centroids.geometry.centroid
 
-    joined = gpd.sjoin(
-        zips_centroids,
-        climate_zones[["cz_groups", "geometry"]],
-        how="left",
-        predicate="within"
-    )
-    zips["cz_groups"] = joined["cz_groups"]
-    zips_climate = zips[zips["cz_groups"].notna()].copy()
-    return zips_climate  # has ZIP_CODE, geometry, cz_groups, etc.
+    # Look up the climate zone polygon containing each ZIP centroid (no sjoin frame)
+    tree = shapely.STRtree(climate_zones.geometry.to_numpy())
+    cent = shapely.centroid(zips.geometry.to_numpy())
+    input_idx, tree_idx = tree.query(cent, predicate="within")
+
+    cz = np.full(len(zips), None, dtype=object)
+    cz[input_idx] = climate_zones["cz_groups"].to_numpy()[tree_idx]
+
+    # Drop the polygons here; downstream only needs the labels
+    zips_climate = pd.DataFrame({"ZIP_CODE": zips["ZIP_CODE"].to_numpy(), "cz_groups": cz}).dropna()
+    return zips_climate  # ZIP_CODE, cz_groups
 
 
 def load_calmac_characteristics():
@@ -93,67 +151,64 @@ def load_calmac_characteristics():
     return a combined DataFrame with 'gp' and 'seg_cz' columns.
     """
     print("Loading CALMAC characteristics...")
-    res_chars = pd.read_csv("CALMAC/res_characteristics.csv")
-    nonres_chars = pd.read_csv("CALMAC/nonres_characteristics.csv")
+    # Only gp and seg_cz are used downstream; parse them with the multithreaded pyarrow reader
+    read_opts = dict(engine="pyarrow", usecols=["gp", "seg_cz"], dtype={"gp": str, "seg_cz": str})
+    res_chars = pd.read_csv("CALMAC/res_characteristics.csv", **read_opts)
+    nonres_chars = pd.read_csv("CALMAC/nonres_characteristics.csv", **read_opts)
 
     res_chars["type"] = "residential"
     nonres_chars["type"] = "nonresidential"
 
     gps_all = pd.concat([res_chars, nonres_chars], ignore_index=True)
+    gps_all = gps_all.astype({"gp": "category"})
     return gps_all
 
 
-def zip_gp_lookup(zips_climate: gpd.GeoDataFrame, gps_all: pd.DataFrame) -> pd.DataFrame:
+def zip_gp_lookup(zips_climate: pd.DataFrame, gps_all: pd.DataFrame) -> pd.DataFrame:
     """
     Build a ZIP → GP lookup table no geometry.
 
     Steps:
-    - Group GPs by CALMAC climate zone label (seg_cz)
-    - Merge onto ZIPs by cz_groups (must match seg_cz labels: e.g. 'Coastal')
-    - Explode GP lists so we get one row per ZIP–GP pair
+    - Collect the distinct GPs per CALMAC climate zone label (seg_cz)
+    - For each cz_groups label (must match seg_cz labels: e.g. 'Coastal'),
+      pair every ZIP in that zone with every GP of the zone (np.repeat / np.tile)
+    - Result: one row per ZIP–GP pair
     """
     print("Building ZIP → GP lookup (no geometry)...")
 
-    # Group GPs by CALMAC segment climate zone
-    gps_by_zone = gps_all.groupby("seg_cz")["gp"].apply(list).reset_index()
-    gps_by_zone.rename(columns={"gp": "gp_list"}, inplace=True)
+    # Distinct GPs per CALMAC segment climate zone (characteristics repeat a GP per premise)
+    gps_by_zone = {
+        cz: pd.unique(group["gp"].to_numpy())
+        for cz, group in gps_all.groupby("seg_cz", observed=True, sort=False)
+    }
 
     # zips_climate has a 'cz_groups' column,  match  to 'seg_cz'
     zips_small = zips_climate[["ZIP_CODE", "cz_groups"]].drop_duplicates()
 
-    zip_gp = zips_small.merge(
-        gps_by_zone,
-        left_on="cz_groups",
-        right_on="seg_cz",
-        how="left"
-    )
-
-    zip_gp = zip_gp.drop(columns=["seg_cz"])
-
-    # Explode gp_list to one row per ZIP–GP
-    zip_gp = zip_gp.explode("gp_list").rename(columns={"gp_list": "gp"})
+    # Cartesian product of ZIPs × GPs within each zone; ZIPs whose zone has no GPs are skipped
+    parts = []
+    for cz, group in zips_small.groupby("cz_groups", observed=True, sort=False):
+        if cz not in gps_by_zone:
+            continue
+        zip_vals = group["ZIP_CODE"].to_numpy()
+        gp_vals = gps_by_zone[cz]
+        parts.append(pd.DataFrame({
+            "ZIP_CODE": np.repeat(zip_vals, gp_vals.size),
+            "cz_groups": cz,
+            "gp": np.tile(gp_vals, zip_vals.size),
+        }))
+    zip_gp = pd.concat(parts, ignore_index=True)
+    zip_gp = zip_gp.astype({"ZIP_CODE": "category", "gp": "category"})
 
     print(f"ZIP–GP pairs: {len(zip_gp)}")
     return zip_gp  
 
 #3. Aggregate Load Shapes gp x month x hour
-def aggregate_load_shapes():
+def aggregate_load_shapes(needed_gps=None):
     print("Loading CALMAC load shapes...")
-    load_data = load_calmac_load_shapes()
-
-    # Ensure date is datetime
-    load_data["date"] = pd.to_datetime(load_data["date"])
-
-    # Filter to May–October
-    load_data = load_data[load_data["date"].dt.month.isin([5, 6, 7, 8, 9, 10])].copy()
-    load_data["month"] = load_data["date"].dt.month
-
-    # Aggregate to month-hour-gp
-    load_month_hour = (
-        load_data
-        .groupby(["gp", "month", "hour"], as_index=False)
-        .agg({"kwh": "mean"})  # or "sum" depending on how you want to use it
-    )
+    # Mean kwh per month-hour-gp (May–October), aggregated in Arrow by the loader;
+    # rows for GPs no mapped feeder uses are dropped before the group-by
+    load_month_hour = load_month_hour_means(gps=needed_gps)
 
     print(
         f"Aggregated load rows: {len(load_month_hour)} "
@@ -165,77 +220,137 @@ def aggregate_load_shapes():
 
 # 4. Map feeders to zips
 
-def feeder_zips_map(feeders: gpd.GeoDataFrame, zips_climate: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
-    """Map each feeder to a ZIP using a spatial join."""
-    print("Mapping feeders to ZIPs...")
-    print("Mapping feeders → ZIPs...")
+def feeder_zips_map(feeders: gpd.GeoDataFrame, zip_geoms: np.ndarray, zip_codes: np.ndarray) -> pd.DataFrame:
+    """
+    Map each feeder to the ZIP containing the longest stretch of its line.
 
-    # Ensure same CRS
-    feeders = feeders.to_crs(zips_climate.crs)
+    zip_geoms are the ZIP polygons (already limited to the ZIPs in
+    zips_climate; feeders and polygons both in PROJECTED_CRS); zip_codes[i]
+    is the ZIP_CODE of zip_geoms[i].
+    """
+    print("Mapping feeders → ZIPs...")
 
-    # Use centroid for assignment
-    feeders = feeders.copy()
-    feeders["centroid"] = feeders.geometry.centroid
-    feeders_centroids = feeders.set_geometry("centroid")
-
-    feeder_zip = gpd.sjoin(
-        feeders_centroids,
-        zips_climate[["ZIP_CODE", "geometry"]],
-        how="left",
-        predicate="within"
-    )
-    feeder_zip = feeder_zip[["feederid", "ZIP_CODE"]].dropna(subset=["ZIP_CODE"])
-    #only one zip per feeder
-    feeder_zip_map = (
-        feeder_zip.drop_duplicates(subset=["feederid"]).reset_index(drop=True)
-    )
+    # Candidate feeder–ZIP pairs: every ZIP polygon the feeder line intersects.
+    # Index the simple feeder lines and query with the large ZIP polygons, which
+    # STRtree prepares, rather than testing each line against raw polygons
+    feeder_geoms = feeders.geometry.to_numpy()
+    zip_idx, input_idx = shapely.STRtree(feeder_geoms).query(zip_geoms, predicate="intersects")
+
+    # Length of feeder line inside each candidate ZIP, only for feeders with more
+    # than one candidate; lines that only touch a shared boundary get ~0 and lose
+    # to the ZIP they actually run through
+    overlap = np.zeros(len(input_idx))
+    multi = np.bincount(input_idx, minlength=len(feeder_geoms))[input_idx] > 1
+    lines = feeder_geoms[input_idx[multi]]
+    # Clip each ZIP polygon to its feeder's bounding box first, so the exact
+    # intersection only sees the few polygon vertices near the line
+    clipped = np.array([
+        shapely.clip_by_rect(poly, *bbox)
+        for poly, bbox in zip(zip_geoms[zip_idx[multi]], shapely.bounds(lines))
+    ])
+    overlap[multi] = shapely.length(shapely.intersection(lines, clipped))
+
+    #only one zip per feeder: longest overlap first, ties broken by ZIP position
+    order = np.lexsort((zip_idx, -overlap, input_idx))
+    input_idx, zip_idx = input_idx[order], zip_idx[order]
+    first = np.r_[True, input_idx[1:] != input_idx[:-1]]
+
+    feeder_zip_map = pd.DataFrame({
+        "feederid": feeders["feederid"].to_numpy()[input_idx[first]],
+        "ZIP_CODE": zip_codes[zip_idx[first]],
+    })
+    feeder_zip_map = feeder_zip_map.astype({"feederid": "category", "ZIP_CODE": "category"})
 
     print(f"Unique feeders mapped: {feeder_zip_map['feederid'].nunique()}")
     return feeder_zip_map
 
+def align_categories(column: str, *frames: pd.DataFrame) -> list:
+    """
+    Cast `column` in each frame to one shared, sorted CategoricalDtype so
+    merges on it compare integer codes instead of hashing strings.
+    """
+    categories = pd.api.types.union_categoricals(
+        [f[column].astype("category") for f in frames], sort_categories=True
+    ).categories
+    dtype = pd.CategoricalDtype(categories)
+    return [f.astype({column: dtype}) for f in frames]
+
+def code_join(left_codes: np.ndarray, right_codes: np.ndarray) -> tuple:
+    """
+    Inner join on integer codes. Returns (left, right) row positions, one pair
+    per match, in left order (right matches keep their original order).
+    """
+    order = np.argsort(right_codes, kind="stable")
+    sorted_codes = right_codes[order]
+    start = np.searchsorted(sorted_codes, left_codes, side="left")
+    counts = np.searchsorted(sorted_codes, left_codes, side="right") - start
+
+    left = np.repeat(np.arange(len(left_codes)), counts)
+    # offset of each match within its left row's run of right rows
+    run_offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    right = order[np.repeat(start, counts) + run_offsets]
+    return left, right
+
 # 5. Pivot wide
 def build_feeder_gp(zip_gp: pd.DataFrame, load_month_hour: pd.DataFrame, feeder_zip_map: pd.DataFrame) -> pd.DataFrame:
     """
     Build feeder-level load features. Final shape: one row per feederid, ZIP, month, hour)
     """
     print("Building feeder × month-hour load features...")
-    # keep only zips with feeders
-    zips_for_feeders = feeder_zip_map["ZIP_CODE"].unique()
-    zip_gp_sub = zip_gp[zip_gp["ZIP_CODE"].isin(zips_for_feeders)].copy()
+    # Shared categories for the join keys, so their codes can be joined directly
+    zip_gp, feeder_zip_map = align_categories("ZIP_CODE", zip_gp, feeder_zip_map)
+    zip_gp, load_month_hour = align_categories("gp", zip_gp, load_month_hour)
 
-    # Join ZIP → feeder to get feeder–ZIP–GP
-    feeder_zip_gp = feeder_zip_map.merge(
-        zip_gp_sub,
-        on="ZIP_CODE",
-        how="left"
-    )
-    
-    # feeder-gp pairs
-    feeder_gp = (
-        feeder_zip_gp[["feederid", "gp"]].dropna(subset=["gp"]).drop_duplicates()
+    # Join ZIP → feeder to get feeder-gp pairs (ZIPs without feeders never match)
+    fz_rows, zg_rows = code_join(
+        feeder_zip_map["ZIP_CODE"].cat.codes.to_numpy(), zip_gp["ZIP_CODE"].cat.codes.to_numpy()
     )
+    feeder_gp = pd.DataFrame({
+        "feederid": feeder_zip_map["feederid"].array.take(fz_rows),
+        "gp": zip_gp["gp"].array.take(zg_rows),
+    }).drop_duplicates(ignore_index=True)
+    del fz_rows, zg_rows
     print(f"Feeder-GP pairs: {len(feeder_gp)}")
 
-    #join feeder-GP with loads
-    feeder_gp_month_hour = feeder_gp.merge(
-        load_month_hour,
-        on="gp",
-        how="left"
+    #join feeder-GP with loads. feeder_gp is deduplicated above, so unique loads per
+    # (gp, month, hour) give one row per (feederid, month, hour, gp) cell; the
+    # scatter below would silently keep only one of any duplicates
+    assert not load_month_hour.duplicated(["gp", "month", "hour"]).any()
+    fg_rows, load_rows = code_join(
+        feeder_gp["gp"].cat.codes.to_numpy(), load_month_hour["gp"].cat.codes.to_numpy()
+    )
+    loads = pd.concat(
+        [
+            feeder_gp.iloc[fg_rows].reset_index(drop=True),
+            load_month_hour.iloc[load_rows][["month", "hour", "kwh"]].reset_index(drop=True),
+        ],
+        axis=1,
+    )
+    del feeder_gp, fg_rows, load_rows
+    # GP to columns: one row per feeder-month-hour. (feederid, gp) pairs are unique
+    # and loads are unique per (gp, month, hour), so each cell gets at most one
+    # value; scatter them into a zero matrix instead of running pivot_table.
+    row_keys = ["feederid", "month", "hour"]
+    row_codes, row_index = pd.MultiIndex.from_frame(loads[row_keys]).factorize(sort=True)
+    col_codes, gps = pd.factorize(loads["gp"], sort=True)
+
+    values = np.zeros((len(row_index), len(gps)), dtype=loads["kwh"].dtype)
+    values[row_codes, col_codes] = loads["kwh"].to_numpy()
+
+    # The long feeder-gp-month-hour rows are the largest intermediate; free them
+    # before the wide frame is assembled
+    key_dtypes = loads[row_keys].dtypes.to_dict()
+    del loads, row_codes, col_codes
+    gc.collect()
+
+    # rename kwh_gp (wrap the matrix without copying it)
+    feeder_wide = pd.concat(
+        [
+            row_index.to_frame(index=False, name=row_keys).astype(key_dtypes),
+            pd.DataFrame(values, columns=[f"kwh_{gp}" for gp in gps], copy=False),
+        ],
+        axis=1,
     )
-    #pivot GP to columns: one row per feeder-month-hour
-    feeder_wide = feeder_gp_month_hour.pivot_table(
-        index=["feederid", "month", "hour"],
-        columns="gp",
-        values="kwh",
-        aggfunc="mean",
-        fill_value=0.0,
-    ).reset_index()
-
-    # flatten GP columns, rename kwh_gp
-    feeder_wide.columns = [
-        f"kwh_{c}" if isinstance(c, str) and not c in {"feederid", "month", "hour"} else c
-        for c in feeder_wide.columns
-    ]
     #merge Zip_code back in
     feeder_wide = feeder_wide.merge(
         feeder_zip_map,
@@ -304,39 +419,60 @@ def attach_ev_to_feeders(feeder_features: pd.DataFrame, ev_df: pd.DataFrame) ->
     print(f"Rows after EV merge:  {len(merged):,}")
     return merged
 
-def main():
-    # 1. Load  climate + ZIP
-    climate_zones = load_climate_zones()
-    climate_zones = map_climate_zones(climate_zones)
+def main(force: bool = False):
+    """Run the feeder pipeline; force=True re-reads inputs instead of using cache/."""
+    # 1. Read the independent inputs concurrently (pyogrio, pandas and Arrow
+    # release the GIL while parsing); the load shape Parquet cache is built here too
+    loaders = {
+        "climate_zones": functools.partial(load_climate_zones, force=force),
+        "zips": functools.partial(load_zip_polygons, force=force),
+        "feeders": functools.partial(load_feeders, force=force),
+        "gps_all": load_calmac_characteristics,
+        "ev_df": load_ev_data,
+        "load_shapes": ensure_parquet_cache,
+    }
+    with ThreadPoolExecutor(max_workers=len(loaders)) as ex:
+        futures = {name: ex.submit(fn) for name, fn in loaders.items()}
+        inputs = {name: f.result() for name, f in futures.items()}
 
-    zips = load_zip_polygons()
+    # Project every layer to PROJECTED_CRS once; nothing downstream reprojects
+    climate_zones = inputs["climate_zones"].to_crs(PROJECTED_CRS)
+    zips = inputs["zips"].to_crs(PROJECTED_CRS)
+    feeders = inputs["feeders"].to_crs(PROJECTED_CRS)
+
+    # 2. Climate + ZIP
+    climate_zones = map_climate_zones(climate_zones)
     zips_climate = process_zip_climate_mapping(zips, climate_zones)
 
-    # 2. CALMAC GPs + ZIP to GP mapping
-    gps_all = load_calmac_characteristics()
-    zip_gp = zip_gp_lookup(zips_climate, gps_all)
+    # 3. CALMAC GPs + ZIP to GP mapping
+    zip_gp = zip_gp_lookup(zips_climate, inputs["gps_all"])
 
-    # 3. Aggregate CALMAC load shapes to gp × month × hour (May–Oct)
-    load_month_hour = aggregate_load_shapes()
+    # 4. Map feeders to ZIPs (only ZIPs with a climate zone)
+    zip_polys = zips[zips["ZIP_CODE"].isin(zips_climate["ZIP_CODE"])]
+    feeder_zip_map = feeder_zips_map(feeders, zip_polys.geometry.to_numpy(), zip_polys["ZIP_CODE"].to_numpy())
 
-    # 4. Load feeders + map to ZIPs
-    feeders = load_feeders()
-    feeder_zip_map = feeder_zips_map(feeders, zips_climate)
+    # Aggregate CALMAC load shapes to gp × month × hour (May–Oct), only for
+    # GPs reachable from a mapped feeder
+    feeder_zips = feeder_zip_map["ZIP_CODE"].astype(str).unique()
+    needed_gps = zip_gp.loc[zip_gp["ZIP_CODE"].astype(str).isin(feeder_zips), "gp"].unique()
+    load_month_hour = aggregate_load_shapes(needed_gps)
 
     # 5. Build feeder × month-hour × GP load matrix
     feeder_features = build_feeder_gp(zip_gp, load_month_hour, feeder_zip_map)
-    #6. Load EV data and merge onto feeder_features
-    ev_df = load_ev_data()
-    feeder_features = attach_ev_to_feeders(feeder_features, ev_df)
+    #6. Merge EV data onto feeder_features
+    feeder_features = attach_ev_to_feeders(feeder_features, inputs["ev_df"])
 
     
-    feeder_features.to_csv("outputs/feeder_load_features.csv", index=False)
-    print("Saved feeder_load_features.csv")
+    feeder_features.to_parquet("outputs/feeder_load_features.parquet", compression="zstd", index=False)
+    print("Saved feeder_load_features.parquet")
 
     return feeder_features
 
 
 if __name__ == "__main__":
-    feeder_features = main()
+    parser = argparse.ArgumentParser(description="Build the feeder × month-hour feature matrix.")
+    parser.add_argument("--force", action="store_true", help="ignore cached loader outputs in cache/")
+    args = parser.parse_args()
+    feeder_features = main(force=args.force)
 
     
\ No newline at end of file